@@ -1,30 +1,77 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from dotenv import load_dotenv
-import os
+from datetime import timedelta
+import hashlib
+import logging
+import ssl
+import threading
+import time
 
-load_dotenv()
+from cachetools import TTLCache
+import jwt
 
-# Secret key and settings
-SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")  # fallback for dev
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour
+from app.core.config import settings
+
+# Secret key and settings (single source of truth in app.core.config)
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+
+# Encoded/frozen once instead of on every encode/decode call
+_SECRET_BYTES = SECRET_KEY.encode("utf-8")
+_ALGORITHMS = (ALGORITHM,)
+_TOKEN_TTL_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# Verified tokens, keyed by SHA-256 of the token so raw tokens are never
+# held in memory. Entries live at most TOKEN_CACHE_TTL seconds; the
+# token's own `exp` is re-checked on every hit. Invalid tokens are not
+# cached.
+TOKEN_CACHE_TTL = 10
+_token_cache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def check_crypto_backend():
+    """Log the OpenSSL build used for JWT HMAC-SHA256 and warn if hashlib
+    isn't backed by it (e.g. Python built without OpenSSL)."""
+    logger.info("JWT signing via %s", ssl.OPENSSL_VERSION)
+    if hashlib.sha256.__name__ != "openssl_sha256":
+        logger.warning(
+            "hashlib.sha256 is not OpenSSL-backed; JWT HMAC will be slower"
+        )
 
 # Create access token
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # `exp` is plain epoch seconds; no datetime objects to build or convert
+    ttl = int(expires_delta.total_seconds()) if expires_delta else _TOKEN_TTL_SECONDS
+    to_encode = {**data, "exp": int(time.time()) + ttl}
+    encoded_jwt = jwt.encode(to_encode, _SECRET_BYTES, algorithm=ALGORITHM)
     return encoded_jwt
 
 # Verify token
 def verify_access_token(token: str):
+    key = hashlib.sha256(token.encode()).digest()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+    if cached is not None:
+        user_id, exp = cached
+        if exp > time.time():
+            return user_id
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(
+            token,
+            _SECRET_BYTES,
+            algorithms=_ALGORITHMS,
+            options={"require": ["exp"]},
+        )
         user_id = payload.get("user_id")
         if user_id is None:
             return None
-        return user_id
-    except JWTError:
-        return None
\ No newline at end of file
+    except jwt.PyJWTError:
+        return None
+
+    with _token_cache_lock:
+        _token_cache[key] = (user_id, payload["exp"])
+    return user_id
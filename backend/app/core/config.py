@@ -10,8 +10,25 @@ class Settings:
     DB_NAME: str = os.getenv("DB_NAME")
     DB_USER: str = os.getenv("DB_USER")
     DB_PASS: str = os.getenv("DB_PASS")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))  # seconds
     SECRET_KEY: str = os.getenv("SECRET_KEY", "fallback_secret_key")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60  # 1 hour
+    # Size of the AnyIO threadpool that runs sync dependencies/endpoints
+    THREADPOOL_SIZE: int = int(
+        os.getenv("THREADPOOL_SIZE", (os.cpu_count() or 1) * 4)
+    )
+    # Pre-generated OpenAPI schema to serve instead of building it on first hit
+    OPENAPI_SCHEMA_PATH: str | None = os.getenv("OPENAPI_SCHEMA_PATH")
+    # Comma-separated list of frontend origins allowed by CORS
+    CORS_ORIGINS: tuple[str, ...] = tuple(
+        origin.strip()
+        for origin in os.getenv(
+            "CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173"
+        ).split(",")
+        if origin.strip()
+    )
 
 settings = Settings()
\ No newline at end of file
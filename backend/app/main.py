@@ -1,21 +1,58 @@
+import json
+import logging
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
-from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from app.core.auth import check_crypto_backend
+from app.core.config import settings
 from app.routes import user_routes as user_router
 
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# ---------- STARTUP ----------
+def load_openapi_schema(app: FastAPI):
+    path = settings.OPENAPI_SCHEMA_PATH
+    if not path:
+        return
+    try:
+        with open(path, encoding="utf-8") as f:
+            app.openapi_schema = json.load(f)
+    except FileNotFoundError:
+        logger.warning("OpenAPI schema %s not found; generating on demand", path)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_crypto_backend()
+    load_openapi_schema(app)
+    # Password hashing has its own executor, so the default threadpool only
+    # serves the few sync callables left and can be sized to the machine
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = settings.THREADPOOL_SIZE
+    yield
+
+
 app = FastAPI(
     title="DhanSaathi API",
     version="1.0.0",
-    description="API for authentication and user management"
+    description="API for authentication and user management",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # ---------- MIDDLEWARE ----------
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PATCH"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # let browsers cache preflight responses for 24h
 )
 
 # ---------- ROUTERS ----------
@@ -25,42 +62,3 @@ app.include_router(user_router.router, prefix="/api/users")
 @app.get("/")
 def read_root():
     return {"message": "Welcome to DhanSaathi API"}
-
-
-# ---------- CUSTOM OPENAPI (Swagger UI with Bearer Auth) ----------
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-
-    openapi_schema = get_openapi(
-        title=app.title,
-        version=app.version,
-        description=app.description,
-        routes=app.routes,
-    )
-
-    openapi_schema["components"]["securitySchemes"] = {
-        "BearerAuth": {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT"
-        }
-    }
-
-    # Apply BearerAuth only to protected routes
-    protected_paths = [
-        "/api/users/users",
-        "/api/users/users/{user_id}",
-        "/api/users/me"
-    ]
-
-    for path, path_item in openapi_schema["paths"].items():
-        if path in protected_paths:
-            for method in path_item.values():
-                method["security"] = [{"BearerAuth": []}]
-
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
-
-
-app.openapi = custom_openapi
\ No newline at end of file
@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, UniqueConstraint
 from app.db.database import Base
 
+# Named explicitly so routes can tell which unique key a write violated.
+# These match the names Postgres generates for unnamed unique columns, so
+# tables created before the names were pinned already use them.
+USERS_EMAIL_KEY = "users_email_key"
+USERS_USERNAME_KEY = "users_username_key"
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        UniqueConstraint("email", name=USERS_EMAIL_KEY),
+        UniqueConstraint("username", name=USERS_USERNAME_KEY),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, nullable=False)
-    email = Column(String, unique=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
\ No newline at end of file
+    username = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+    hashed_password = Column(String, nullable=False)
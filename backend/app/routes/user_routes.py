@@ -1,17 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import bcrypt
+from cachetools import TTLCache
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
 from app.db.database import SessionLocal
-from app.models.user import User
+from app.models.user import USERS_EMAIL_KEY, USERS_USERNAME_KEY, User
 from app.core.auth import create_access_token, verify_access_token
 
 # ✅ IMPORTANT: NO prefix here
 router = APIRouter(tags=["Users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost 10 is a quarter of the work of the old default of 12.
+# Hashes at any other cost are rehashed on the next successful login.
+BCRYPT_ROUNDS = 10
+
+# Dedicated pool for CPU-bound hashing so slow logins stay off the event
+# loop and out of the default threadpool.
+password_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="password-hash",
+)
+
+# Authenticated users by id, so repeat requests from the same user skip the
+# SELECT in get_current_user. The cache is per worker process: a profile
+# update drops the entry in the worker that handled it, and entries in other
+# workers go stale after USER_CACHE_TTL seconds at most.
+USER_CACHE_TTL = 30
+USER_CACHE = TTLCache(maxsize=5000, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()
 
 # ---------- SCHEMAS ----------
 class UserCreate(BaseModel):
@@ -25,43 +55,134 @@ class UserResponse(BaseModel):
     username: str
     email: str
 
-    class Config:
-        from_attributes = True
-
 
 class UserUpdate(BaseModel):
     username: str | None = None
     email: str | None = None
 
 
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Detached snapshot of the authenticated user, safe to cache."""
+
+    id: int
+    username: str
+    email: str
+
+
 # ---------- DB DEPENDENCY ----------
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+UNIQUE_VIOLATION = "23505"  # Postgres SQLSTATE unique_violation
+
+UNIQUE_VIOLATION_DETAILS = {
+    USERS_EMAIL_KEY: "Email already in use",
+    USERS_USERNAME_KEY: "Username already taken",
+}
+
+
+def violated_constraint(exc: IntegrityError):
+    """Name of the constraint behind an IntegrityError, taken from the
+    asyncpg error SQLAlchemy wraps (None if the driver didn't report one)."""
+    return getattr(exc.orig.__cause__, "constraint_name", None)
+
+
+def unique_violation_detail(exc: IntegrityError):
+    """400 message for a unique-key clash on users, or None when the error
+    isn't a unique violation and should propagate."""
+    if getattr(exc.orig, "sqlstate", None) != UNIQUE_VIOLATION:
+        return None
+    return UNIQUE_VIOLATION_DETAILS.get(
+        violated_constraint(exc), "Email or username already in use"
+    )
 
 
 # ---------- PASSWORD UTILS ----------
+# bcrypt only uses the first 72 bytes of a password; truncate explicitly
+# as passlib did, since newer bcrypt releases reject longer input.
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode()[:72], salt).decode()
+
+
+def verify_password(password: str, hashed_password: str):
+    try:
+        return bcrypt.checkpw(password.encode()[:72], hashed_password.encode())
+    except ValueError:
+        return False
+
+
+def password_needs_update(hashed_password: str):
+    # "$2b$<cost>$<salt+hash>"
+    return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+
+
+_DUMMY_HASH = hash_password("dummy_password_for_timing")
+
+
+async def run_in_password_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool, func, *args)
+
+
+# ---------- HTTP CACHING ----------
+def user_etag_response(request: Request, user_id: int, username: str, email: str):
+    """Return the user as JSON with a strong ETag, or a bodiless 304 when the
+    client's If-None-Match already matches."""
+    digest = hashlib.blake2b(
+        repr((user_id, username, email)).encode(), digest_size=16
+    ).hexdigest()
+    etag = f'"{digest}"'
+    # Responses are per-user: keep them out of shared caches and make the
+    # browser revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    return ORJSONResponse(
+        {"id": user_id, "username": username, "email": email}, headers=headers
+    )
 
 
 # ---------- REGISTER ----------
 @router.post("/register")
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-
-    new_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hash_password(user.password),
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await run_in_password_pool(hash_password, user.password)
+
+    # One round trip, and the unique indexes decide concurrent registrations
+    # instead of a separate SELECT: an email clash returns no row, a
+    # username clash raises IntegrityError.
+    stmt = (
+        pg_insert(User)
+        .values(
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.email)
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        new_user = (await db.execute(stmt)).first()
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        detail = unique_violation_detail(exc)
+        if detail is None:
+            raise
+        raise HTTPException(status_code=400, detail=detail)
+
+    if new_user is None:
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     return {
         "message": "User registered successfully",
@@ -71,15 +192,32 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 # ---------- LOGIN ----------
 @router.post("/login")
-def login_user(
+async def login_user(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
+    result = await db.execute(
+        select(User.id, User.username, User.email, User.hashed_password)
+        .where(User.email == form_data.username)
+    )
+    user = result.first()
 
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+    # Verify against a dummy hash for unknown emails so both failure paths
+    # cost the same and response time doesn't reveal which accounts exist.
+    hashed_password = user.hashed_password if user else _DUMMY_HASH
+    password_ok = await run_in_password_pool(
+        verify_password, form_data.password, hashed_password
+    )
+    if not user or not password_ok:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
+    if password_needs_update(user.hashed_password):
+        new_hash = await run_in_password_pool(hash_password, form_data.password)
+        await db.execute(
+            update(User).where(User.id == user.id).values(hashed_password=new_hash)
+        )
+        await db.commit()
+
     access_token = create_access_token(data={"user_id": user.id})
 
     return {
@@ -99,73 +237,127 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user_id = verify_access_token(token)
 
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    with _user_cache_lock:
+        cached = USER_CACHE.get(user_id)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(
+        select(User.id, User.username, User.email).where(User.id == user_id)
+    )
+    user = result.first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return user
+    current_user = CurrentUser(id=user.id, username=user.username, email=user.email)
+    with _user_cache_lock:
+        USER_CACHE[user_id] = current_user
+    return current_user
 
 
 # ---------- ME ----------
-@router.get("/me", response_model=UserResponse)
-def get_my_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+@router.get("/me", responses={200: {"model": UserResponse}})
+async def get_my_profile(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    # Served from USER_CACHE like every other protected route: a PATCH on a
+    # different worker can leave this body (and its ETag) stale for up to
+    # USER_CACHE_TTL seconds.
+    return user_etag_response(
+        request, current_user.id, current_user.username, current_user.email
+    )
 
 
 @router.patch("/me")
-def update_my_profile(
+async def update_my_profile(
     payload: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
+    changes = {}
     if payload.username:
-        current_user.username = payload.username
-
+        changes["username"] = payload.username
     if payload.email:
-        existing = db.query(User).filter(User.email == payload.email).first()
-        if existing and existing.id != current_user.id:
-            raise HTTPException(status_code=400, detail="Email already in use")
-        current_user.email = payload.email
-
-    db.commit()
-    db.refresh(current_user)
+        changes["email"] = payload.email
+
+    user = current_user
+    if changes:
+        # The unique constraints on users decide conflicts at write time
+        # instead of a separate SELECT beforehand.
+        stmt = (
+            update(User)
+            .where(User.id == current_user.id)
+            .values(**changes)
+            .returning(User.id, User.username, User.email)
+        )
+        try:
+            user = (await db.execute(stmt)).first()
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            detail = unique_violation_detail(exc)
+            if detail is None:
+                raise
+            raise HTTPException(status_code=400, detail=detail)
+
+        with _user_cache_lock:
+            USER_CACHE.pop(current_user.id, None)
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
     return {
         "message": "Profile updated",
         "user": {
-            "id": current_user.id,
-            "username": current_user.username,
-            "email": current_user.email,
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
         },
     }
 
 
 # ---------- USERS ----------
-@router.get("/", response_model=list[UserResponse])
-def get_all_users(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+# Rows come straight from the users table, so read endpoints skip
+# response_model re-validation (plain dicts / direct responses); the schema
+# is still documented via `responses`.
+@router.get("/", responses={200: {"model": list[UserResponse]}})
+async def get_all_users(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    return db.query(User).all()
+    result = await db.execute(
+        select(User.id, User.username, User.email)
+        .order_by(User.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return [dict(row) for row in result.mappings()]
 
 
-@router.get("/{user_id}", response_model=UserResponse)
-def get_user_by_id(
+@router.get("/{user_id}", responses={200: {"model": UserResponse}})
+async def get_user_by_id(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(
+        select(User.id, User.username, User.email).where(User.id == user_id)
+    )
+    user = result.first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return user_etag_response(request, user.id, user.username, user.email)